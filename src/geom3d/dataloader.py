@@ -7,6 +7,7 @@ Functions:
 - load_molecule(InChIKey, target, db)
 - generate_dataset(df_total, df_precursors, db, model_name, radius, number_of_molecules=500)
 - train_val_test_split(dataset, config, batch_size, smiles_list=None)
+- get_loader_kwargs(config)
 """
 import stk
 import pymongo
@@ -167,7 +168,8 @@ def load_molecule(InChIKey, target, db):
                 for atom in polymer.get_atom_infos()
             ]
         )
-        atom_types = torch.tensor(atom_types, dtype=torch.long)
+        # atomic numbers fit in uint8, cast to long in Pymodel.forward
+        atom_types = torch.tensor(atom_types, dtype=torch.uint8)
         
         y = torch.tensor(target, dtype=torch.float32)
 
@@ -345,27 +347,25 @@ def train_val_test_split(dataset, config, batch_size, smiles_list=None):
     else:
         dataloader_kwargs = {}
         DataLoaderClass = DataLoader
+    dataloader_kwargs.update(get_loader_kwargs(config))
 
     # Set dataloaders
     train_loader = DataLoaderClass(
         train_dataset,
         batch_size=batch_size,
         shuffle=True,
-        num_workers=config["num_workers"],
         **dataloader_kwargs
     )
     val_loader = DataLoaderClass(
         valid_dataset,
         batch_size=batch_size,
         shuffle=True,
-        num_workers=config["num_workers"],
         **dataloader_kwargs
     )
     test_loader = DataLoaderClass(
         test_dataset,
         batch_size=batch_size,
         shuffle=True,
-        num_workers=config["num_workers"],
         **dataloader_kwargs
     )
     if not smiles_list:
@@ -380,3 +380,31 @@ def train_val_test_split(dataset, config, batch_size, smiles_list=None):
             test_loader,
             (train_smiles, valid_smiles, test_smiles),
         )
+
+
+def get_loader_kwargs(config):
+    """
+    Get the worker and host memory settings shared by all the dataloaders
+    Set config["num_workers"] to None to use one worker per CPU core per GPU
+
+    Args:
+    - config (dict): dictionary containing the configuration
+
+    Returns:
+    - loader_kwargs (dict): keyword arguments for the dataloaders
+    """
+
+    num_workers = config["num_workers"]
+    if num_workers is None:
+        num_gpus = max(torch.cuda.device_count(), 1)
+        num_workers = max(4, os.cpu_count() // num_gpus)
+
+    # pinned memory lets the host to device copy run asynchronously
+    loader_kwargs = {
+        "num_workers": num_workers,
+        "pin_memory": torch.cuda.is_available(),
+    }
+    if num_workers > 0:
+        loader_kwargs["persistent_workers"] = True
+        loader_kwargs["prefetch_factor"] = 4
+    return loader_kwargs
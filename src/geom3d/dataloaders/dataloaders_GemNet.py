@@ -70,16 +70,27 @@ class BatchGemNet(Data):
         for index_key in index_keys:
             batch[index_key] = torch.tensor(index_batch[index_key], dtype=torch.int64)
 
-        return batch.contiguous()
+        batch = batch.contiguous()
+        # counted here so that reading num_graphs does not sync with the device
+        batch._num_graphs = len(data_list)
+        return batch
     
     @property
     def num_graphs(self):
         '''Returns the number of graphs in the batch.'''
-        return self.batch[-1].item() + 1
+        num_graphs = getattr(self, "_num_graphs", None)
+        if num_graphs is None:
+            # not built by from_data_list
+            num_graphs = int(self.batch[-1]) + 1
+        return num_graphs
 
 
 class DataLoaderGemNet(DataLoader):
     def __init__(self, dataset, batch_size, shuffle, num_workers, cutoff, int_cutoff, triplets_only, **kwargs):
+        # stored so that Lightning can rebuild the loader with a DistributedSampler
+        self.cutoff = cutoff
+        self.int_cutoff = int_cutoff
+        self.triplets_only = triplets_only
         # super(DataLoaderGemNet, self).__init__(
         super().__init__(
             dataset,
@@ -148,6 +159,10 @@ class DataLoaderGemNet(DataLoader):
 
 # class DataLoaderGemNet(DataLoader):
 #     def __init__(self, dataset, batch_size, shuffle, num_workers, cutoff, int_cutoff, triplets_only, **kwargs):
+        # stored so that Lightning can rebuild the loader with a DistributedSampler
+        self.cutoff = cutoff
+        self.int_cutoff = int_cutoff
+        self.triplets_only = triplets_only
 #         # super(DataLoaderGemNet, self).__init__(
 #         super().__init__(
 #             dataset,
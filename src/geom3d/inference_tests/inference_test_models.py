@@ -7,7 +7,8 @@ import os
 import torch
 import copy
 from geom3d import train_models
-from geom3d.train_models import SchNet, DimeNet, DimeNetPlusPlus, GemNet, SphereNet, SphereNetPeriodic, PaiNN, Pymodel
+from geom3d.models import SchNet, DimeNet, DimeNetPlusPlus, GemNet, SphereNet, SphereNetPeriodic, PaiNN
+from geom3d.train_models import Pymodel
 from geom3d.train_models import read_config, load_data, train_val_test_split, model_setup
 import importlib
 import matplotlib.pyplot as plt
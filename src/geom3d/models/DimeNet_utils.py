@@ -1,3 +1,5 @@
+import functools
+
 import numpy as np
 import sympy as sym
 from scipy import special as sp
@@ -35,6 +37,8 @@ def spherical_bessel_formulas(n):
     return f
 
 
+# the sympy basis only depends on the arguments, reuse it across models
+@functools.lru_cache(maxsize=None)
 def bessel_basis(n, k):
     zeros = Jn_zeros(n, k)
     normalizer = []
@@ -97,6 +101,7 @@ def associated_legendre_polynomials(k, zero_m_only=True):
     return P_l_m
 
 
+@functools.lru_cache(maxsize=None)
 def real_sph_harm(k, zero_m_only=True, spherical_coordinates=True):
     if not zero_m_only:
         S_m = [0]
@@ -1,3 +1,5 @@
+import functools
+
 import numpy as np
 from scipy.optimize import brentq
 from scipy import special as sp
@@ -44,6 +46,8 @@ def spherical_bessel_formulas(n):
     return j
 
 
+# the sympy basis only depends on the arguments, reuse it across models
+@functools.lru_cache(maxsize=None)
 def bessel_basis(n, k):
     """
     Compute the sympy formulas for the normalized and rescaled spherical bessel functions up to
@@ -171,6 +175,7 @@ def associated_legendre_polynomials(L, zero_m_only=True, pos_m_only=True):
             return P_l_m
 
 
+@functools.lru_cache(maxsize=None)
 def real_sph_harm(L, spherical_coordinates, zero_m_only=True):
     """
     Computes formula strings of the the real part of the spherical harmonics up to degree L (excluded).
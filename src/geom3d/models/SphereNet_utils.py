@@ -1,3 +1,4 @@
+import functools
 from math import pi as PI
 
 import sympy as sym
@@ -8,6 +9,7 @@ from .DimeNet_utils import (associated_legendre_polynomials, bessel_basis,
                             sph_harm_prefactor)
 
 
+@functools.lru_cache(maxsize=None)
 def real_sph_harm(l, zero_m_only=False, spherical_coordinates=True):
     """
     Computes formula strings of the the real part of the spherical harmonics up to order l (excluded).
@@ -15,13 +15,24 @@ from pathlib import Path
 from geom3d import dataloader
 from geom3d.dataloader import load_data, train_val_test_split, load_3d_rpr
 from geom3d.dataloaders.dataloaders_GemNet import DataLoaderGemNet
-from geom3d import models
-from geom3d.models import SchNet, DimeNet, DimeNetPlusPlus, GemNet, SphereNet, SphereNetPeriodic, PaiNN, EquiformerEnergy
 from geom3d.utils import database_utils
 from geom3d.utils.config_utils import read_config
 import importlib
 
 
+def _head_mse_loss(z, weight, bias, y):
+    # linear output layer and MSE loss, fused into a single kernel once compiled
+    return (torch.addmm(bias, z, weight.t()) - y).pow(2).mean()
+
+
+class SqueezeHead(nn.Module):
+    """
+    Output layer for models that already predict the target, drops the dimensions of size 1.
+    """
+    def forward(self, z):
+        return z.squeeze()
+
+
 class PrintLearningRate(pl.Callback):
     def on_train_epoch_start(self, trainer, pl_module):
         lr = trainer.optimizers[0].param_groups[0]['lr']
@@ -37,55 +48,101 @@ class Pymodel(pl.LightningModule):
     
     Args:
     - model (nn.Module): 3D molecular representation learning model
-    - graph_pred_linear (nn.Module): linear layer for graph prediction  
+    - graph_pred_linear (nn.Module): linear layer for graph prediction, a SqueezeHead is used if None
     - config (dict): dictionary containing the configuration
 
     """
     def __init__(self, model, graph_pred_linear, config):
         super().__init__()
         self.save_hyperparameters(ignore=['graph_pred_linear', 'model'])
+        # resolve the model name before compiling, torch.compile wraps the module
+        self.model_name = type(model).__name__
+        if self.model_name == "EquiformerEnergy":
+            self.model_name = "Equiformer"
+
+        # a plain linear head is fused with the loss in _get_preds_loss_accuracy
+        self._fused_head = config.get("compile_model", False) and isinstance(
+            graph_pred_linear, nn.Linear
+        )
+        if self._fused_head:
+            self._head_mse_loss = torch.compile(_head_mse_loss, dynamic=True)
+        # reduce-overhead (opt-in) replays the compiled model as CUDA graphs,
+        # recording a new graph for every new number of atoms or edges
+        compile_mode = config.get("compile_mode", "default")
+        self._cudagraphs = (
+            config.get("compile_model", False)
+            and compile_mode == "reduce-overhead"
+        )
+        if config.get("compile_model", False):
+            # dynamic shapes since the number of atoms changes between batches
+            model = torch.compile(model, mode=compile_mode, dynamic=True)
+            if graph_pred_linear is not None:
+                graph_pred_linear = torch.compile(
+                    graph_pred_linear, mode=compile_mode, dynamic=True
+                )
+        if graph_pred_linear is None:
+            # models without an output layer already return (N, 1)
+            graph_pred_linear = SqueezeHead()
         self.molecule_3D_repr = model
         self.graph_pred_linear = graph_pred_linear
         self.config = config
 
     def training_step(self, batch, batch_idx):
         # training_step defines the train loop.
-        with torch.cuda.amp.autocast(enabled=self.trainer.precision == 16): # 16-bit precision for mixed precision training, activated only when self.trainer.precision == 16
-            loss = self._get_preds_loss_accuracy(batch)
+        # mixed precision autocast is handled by the trainer precision flag
+        loss = self._get_preds_loss_accuracy(batch)
         
         lr = self.trainer.optimizers[0].param_groups[0]['lr']
 
-        self.log("train_loss", loss, batch_size=batch.size(0))
-        self.log('lr', lr, on_step=False, on_epoch=True, prog_bar=False, logger=True, batch_size=batch.size(0))
+        # accumulated on device and reduced across ranks once per epoch
+        self.log("train_loss", loss, on_step=False, on_epoch=True, batch_size=batch.num_graphs, sync_dist=True)
+        self.log('lr', lr, on_step=False, on_epoch=True, prog_bar=False, logger=True, batch_size=batch.num_graphs)
 
         return loss
 
     def validation_step(self, batch, batch_idx):
         """used for logging metrics"""
-        with torch.cuda.amp.autocast(enabled=self.trainer.precision == 16): # 16-bit precision for mixed precision training, activated only when self.trainer.precision == 16
-            loss = self._get_preds_loss_accuracy(batch)
+        loss = self._get_preds_loss_accuracy(batch)
 
         # Log loss and metric
-        self.log("val_loss", loss, batch_size=batch.size(0))
+        # each DDP rank validates its own shard, val_loss is monitored by ModelCheckpoint
+        self.log("val_loss", loss, batch_size=batch.num_graphs, sync_dist=True)
         return loss
 
     def _get_preds_loss_accuracy(self, batch):
         """convenience function since train/valid/test steps are similar"""
-        batch = batch.to(self.device)
-        z = self.forward(batch)
+        # the batch is already on self.device, Lightning transfers it
+        if self._cudagraphs:
+            # outputs of the previous step must not be overwritten by the replay
+            torch.compiler.cudagraph_mark_step_begin()
+        if self._fused_head:
+            z = self.molecule_3D_repr(
+                batch.x.long(), batch.positions, batch.batch
+            )
+            return self._head_mse_loss(
+                z,
+                self.graph_pred_linear.weight,
+                self.graph_pred_linear.bias,
+                batch.y.view(-1, 1),
+            )
 
-        if self.graph_pred_linear is not None:
-            loss = Functional.mse_loss(z, batch.y.unsqueeze(1))
-        else:
-            loss = Functional.mse_loss(z, batch.y)
-        return loss
+        z = self.forward(batch)
+        # targets are stored per molecule as scalars, compare both as (N, 1)
+        return Functional.mse_loss(z.view(-1, 1), batch.y.view(-1, 1))
 
     def configure_optimizers(self):
         # set up optimizer
         # make sure the optimiser step does not reset the val_loss metrics
 
         config = self.config
-        optimizer = torch.optim.Adam(self.parameters(), lr=config["lr"])
+        # linear scaling rule, each DDP process sees its own batch_size
+        lr = config["lr"] * self.trainer.world_size
+        # one fused kernel per step on GPU instead of one per parameter tensor
+        if self.device.type == "cuda":
+            optimizer_kwargs = dict(fused=True)
+        else:
+            optimizer_kwargs = dict(foreach=True)
+        optimizer = torch.optim.Adam(self.parameters(), lr=lr, **optimizer_kwargs)
 
         lr_scheduler = None
         monitor = None
@@ -112,25 +169,23 @@ class Pymodel(pl.LightningModule):
 
         # optimizer = torch.optim.Adam(self.parameters(), lr=5e-4)
         # return optimizer
+
+    def optimizer_zero_grad(self, epoch, batch_idx, optimizer):
+        # free the gradients instead of filling them with zeros
+        optimizer.zero_grad(set_to_none=True)
     
     def forward(self, batch):
         batch = batch.to(self.device)
-        model_name = type(self.molecule_3D_repr).__name__
-        if model_name == "EquiformerEnergy":
-            model_name = "Equiformer"
-
-        if self.graph_pred_linear is not None:
-            if model_name == "PaiNN":
-                z = self.molecule_3D_repr(batch.x, batch.positions, batch.radius_edge_index, batch.batch).squeeze()
-                z = self.graph_pred_linear(z)
-            else:
-                z = self.molecule_3D_repr(batch.x, batch.positions, batch.batch)
-                z = self.graph_pred_linear(z)
+        model_name = self.model_name
+        # atomic numbers are stored as uint8, the embeddings need int64 indices
+        x = batch.x.long()
+
+        if model_name == "PaiNN":
+            z = self.molecule_3D_repr(x, batch.positions, batch.radius_edge_index, batch.batch).squeeze()
+        elif model_name == "GemNet":
+            z = self.molecule_3D_repr(x, batch.positions, batch)
+        elif model_name == "Equiformer":
+            z = self.molecule_3D_repr(node_atom=x, pos=batch.positions, batch=batch.batch)
         else:
-            if model_name == "GemNet":
-                z = self.molecule_3D_repr(batch.x, batch.positions, batch).squeeze()
-            elif model_name == "Equiformer":
-                z = self.molecule_3D_repr(node_atom=batch.x, pos=batch.positions, batch=batch.batch).squeeze()
-            else:
-                z = self.molecule_3D_repr(batch.x, batch.positions, batch.batch).squeeze()
-        return z
\ No newline at end of file
+            z = self.molecule_3D_repr(x, batch.positions, batch.batch)
+        return self.graph_pred_linear(z)
\ No newline at end of file
@@ -37,19 +37,15 @@ from torch_geometric.loader import DataLoader
 from torch_geometric.data import Data, Batch
 import lightning.pytorch as pl
 import torch.nn.functional as Functional
-import torch.distributed as dist
-from torch.nn.parallel import DistributedDataParallel
 from lightning.pytorch.loggers import WandbLogger
 from lightning.pytorch.callbacks import ModelCheckpoint, LearningRateMonitor
 from pathlib import Path
 
 
 from geom3d import dataloader
-from geom3d import models
 from geom3d import pymodel
 from geom3d.dataloader import load_data, train_val_test_split, load_3d_rpr
 from geom3d.dataloaders.dataloaders_GemNet import DataLoaderGemNet
-from geom3d.models import SchNet, DimeNet, DimeNetPlusPlus, GemNet, SphereNet, SphereNetPeriodic, PaiNN, EquiformerEnergy
 from geom3d.utils import database_utils
 from geom3d.utils import train_hyperparam_search
 from geom3d.utils import model_setup_utils
@@ -59,7 +55,6 @@ from geom3d.utils.train_hyperparam_search import objective
 from geom3d.pymodel import Pymodel, PrintLearningRate
 
 
-importlib.reload(models)
 importlib.reload(dataloader)
 importlib.reload(train_hyperparam_search)
 importlib.reload(pymodel)
@@ -79,8 +74,20 @@ def main(config_dir):
     start_time = time.time()
 
     config = read_config(config_dir)
-    np.random.seed(config["seed"])
-    torch.cuda.manual_seed_all(config["seed"])
+    # absolute, the DDP ranks are launched from config["running_dir"]
+    for key in (
+        "running_dir",
+        "STK_path",
+        "dataset_folder",
+        "dataset_path",
+        "dataset_path_frag",
+        "model_path",
+        "pl_model_chkpt",
+    ):
+        if config.get(key):
+            config[key] = os.path.abspath(config[key])
+    # seeds python, numpy and torch, including the dataloader workers
+    pl.seed_everything(config["seed"], workers=True)
     config["device"] = (
         "cuda" if torch.cuda.is_available() else torch.device("cpu")
     )
@@ -124,33 +131,23 @@ def main(config_dir):
 
 
     else:
-        # Initialize distributed training
-        if dist.is_initialized():
-            world_size, rank = init_distributed_training()
-        else:
-            world_size = 1
-            rank = 0
+        # Lightning launches one process per GPU with the DDP strategy
+        num_gpus = torch.cuda.device_count()
 
         model, graph_pred_linear = model_setup(config)
-
-        # Wrap the model with DistributedDataParallel if more than one GPU is available
-        if torch.cuda.device_count() > 1:
-            model = DistributedDataParallel(model)
-        
         print("Model loaded: ", config["model_name"])
 
-        # effective batch size for distributed training
-        effective_batch_size = config["batch_size"] // world_size
-
+        # batch_size is per GPU, the learning rate is scaled in Pymodel
         train_loader, val_loader, test_loader = train_val_test_split(
-            dataset, config=config, batch_size=effective_batch_size
+            dataset, config=config, batch_size=config["batch_size"]
         )
 
         if config["model_path"]:
             model = load_3d_rpr(model, config["model_path"])
         os.chdir(config["running_dir"])
-        wandb.login()
-        wandb.init(settings=wandb.Settings(start_method="fork"))
+        if int(os.environ.get("LOCAL_RANK", 0)) == 0:
+            wandb.login()
+            wandb.init(settings=wandb.Settings(start_method="fork"))
         # model
         #check if chkpt exists
         if os.path.exists(config["pl_model_chkpt"]):
@@ -175,26 +172,45 @@ def main(config_dir):
 
         lr_monitor = LearningRateMonitor(logging_interval="epoch")
 
+        if num_gpus > 1:
+            distributed_kwargs = dict(
+                accelerator="gpu",
+                devices=num_gpus,
+                strategy="ddp",
+                sync_batchnorm=True,
+            )
+        else:
+            distributed_kwargs = dict()
+
         if config["mixed_precision"] is True:
+            # TF32 matmuls for the layers autocast keeps in float32
+            torch.set_float32_matmul_precision("high")
+            # fp16 only on pre-Ampere GPUs, Lightning supports bf16 on CPU
+            if torch.cuda.is_available() and not torch.cuda.is_bf16_supported():
+                precision = "16-mixed"
+            else:
+                precision = "bf16-mixed"
             trainer = pl.Trainer(
                 logger=wandb_logger,
                 max_epochs=config["max_epochs"],
                 val_check_interval=1.0,
-                log_every_n_steps=1,
+                log_every_n_steps=50,
                 callbacks=[checkpoint_callback, lr_monitor, PrintLearningRate()],
-                precision=16,  # 16-bit precision for mixed precision training
+                precision=precision,
+                **distributed_kwargs,
             )
         else:
             trainer = pl.Trainer(
                 logger=wandb_logger,
                 max_epochs=config["max_epochs"],
                 val_check_interval=1.0,
-                log_every_n_steps=1,
+                log_every_n_steps=50,
                 callbacks=[checkpoint_callback, lr_monitor, PrintLearningRate()],
+                **distributed_kwargs,
             )
 
         if config["mixed_precision"] is True:
-            print("Mixed precision training is activated.")
+            print(f"Mixed precision training is activated ({precision}).")
         else:
             print("Mixed precision training is not activated.")
 
@@ -218,16 +234,6 @@ def main(config_dir):
     print(f"Total time taken for model training: {total_time} seconds")
 
 
-# function to initialize distributed training
-def init_distributed_training():
-    rank = int(os.environ.get('RANK', '0'))
-    torch.cuda.set_device(rank)
-    dist.init_process_group(backend='nccl', init_method='env://')
-    print(f"Distributed training - GPU {rank + 1}/{torch.cuda.device_count()}")
-
-    return dist.get_world_size(), rank
-
-
 if __name__ == "__main__":
     from argparse import ArgumentParser
     root = os.getcwd()
@@ -239,8 +245,6 @@ if __name__ == "__main__":
         help="directory to config.json",
     )
     args = argparser.parse_args()
-    config_dir = args.config_dir
-
-    # Initialize distributed training
-    if dist.is_initialized():
-        main(config_dir=config_dir)
\ No newline at end of file
+    # absolute, the config paths are resolved against the launch directory
+    config_dir = os.path.abspath(args.config_dir)
+    main(config_dir=config_dir)
\ No newline at end of file
@@ -46,6 +46,10 @@ def read_config(dir):
         config["target_name"] = "combined"
         config["model_name"] = "SchNet"
         config["mixed_precision"] = False
+        config["compile_model"] = False
+        config["compile_mode"] = "default"
+        config["conv_checkpointing"] = False
+        config["reuse_init_weights"] = ""
 
         config["fragment_cluster_threshold"] = 0.55
         config["test_set_fragment_cluster"] = 6
@@ -0,0 +1,249 @@
+"""
+Registry of the 3D models that can be set up from the configuration file.
+
+Each entry of MODEL_REGISTRY maps config["model_name"] to a ModelEntry. The
+module is only imported when the model is built.
+
+Classes:
+- ModelEntry
+
+Functions:
+- equiformer_preset_kwargs(model_config)
+- build_model(config)
+"""
+import importlib
+from typing import Callable, NamedTuple, Optional
+
+# Equiformer hyperparameter sets, selected by config["model"]["Equiformer_hyperparameter"]
+EQUIFORMER_PRESETS = {
+    # This follows the hyper in Equiformer_l2
+    0: {
+        "fc_neurons": [32, 32],
+        "irreps_feature": "256x0e",
+        "num_heads": 2,
+        "nonlinear_message": False,
+        "irreps_mlp_mid": "192x0e+96x1e+48x2e",
+        "alpha_drop": 0.3,
+        "proj_drop": 0.1,
+        "out_drop": 0.1,
+        "drop_path_rate": 0.1,
+    },
+    # This follows the hyper in Equiformer_nonlinear_bessel_l2_drop00
+    1: {
+        "fc_neurons": [64, 64],
+        "basis_type": "bessel",
+        "irreps_feature": "512x0e",
+        "num_heads": 4,
+        "nonlinear_message": True,
+        "irreps_mlp_mid": "384x0e+192x1e+96x2e",
+        "alpha_drop": 0.0,
+        "proj_drop": 0.0,
+        "out_drop": 0.0,
+        "drop_path_rate": 0.0,
+    },
+}
+
+
+def equiformer_preset_kwargs(model_config):
+    """
+    Get the Equiformer hyperparameter set selected in the configuration file.
+
+    Args:
+    - model_config (dict): config["model"]
+
+    Returns:
+    - kwargs (dict): keyword arguments of the selected hyperparameter set
+    """
+    preset = model_config["Equiformer_hyperparameter"]
+    if preset not in EQUIFORMER_PRESETS:
+        raise ValueError(f"Invalid Equiformer_hyperparameter: {preset}")
+    return EQUIFORMER_PRESETS[preset]
+
+
+class ModelEntry(NamedTuple):
+    """
+    Model that can be set up from the configuration file.
+
+    Attributes:
+    - module (str): module the model class is imported from
+    - cls (str): name of the model class
+    - kw_map (dict): for each argument of the model class, the key of
+      config["model"] it is read from
+    - fixed (dict): arguments that do not depend on the configuration file
+    - extra (callable): optional function of config["model"] returning
+      arguments that depend on it
+    """
+    module: str
+    cls: str
+    kw_map: dict
+    fixed: Optional[dict] = None
+    extra: Optional[Callable] = None
+
+
+MODEL_REGISTRY = {
+    "SchNet": ModelEntry(
+        module="geom3d.models.SchNet",
+        cls="SchNet",
+        kw_map={
+            "hidden_channels": "emb_dim",
+            "num_filters": "SchNet_num_filters",
+            "num_interactions": "SchNet_num_interactions",
+            "num_gaussians": "SchNet_num_gaussians",
+            "cutoff": "SchNet_cutoff",
+            "readout": "SchNet_readout",
+            "node_class": "node_class",
+        },
+    ),
+    "DimeNet": ModelEntry(
+        module="geom3d.models.DimeNet",
+        cls="DimeNet",
+        kw_map={
+            "node_class": "node_class",
+            "hidden_channels": "hidden_channels",
+            "out_channels": "out_channels",
+            "num_blocks": "num_blocks",
+            "num_bilinear": "num_bilinear",
+            "num_spherical": "num_spherical",
+            "num_radial": "num_radial",
+            "cutoff": "cutoff",
+            "envelope_exponent": "envelope_exponent",
+            "num_before_skip": "num_before_skip",
+            "num_after_skip": "num_after_skip",
+            "num_output_layers": "num_output_layers",
+        },
+    ),
+    "DimeNetPlusPlus": ModelEntry(
+        module="geom3d.models.DimeNetPlusPlus",
+        cls="DimeNetPlusPlus",
+        kw_map={
+            "node_class": "node_class",
+            "hidden_channels": "hidden_channels",
+            "out_channels": "out_channels",
+            "num_blocks": "num_blocks",
+            "int_emb_size": "int_emb_size",
+            "basis_emb_size": "basis_emb_size",
+            "out_emb_channels": "out_emb_channels",
+            "num_spherical": "num_spherical",
+            "num_radial": "num_radial",
+            "cutoff": "cutoff",
+            "envelope_exponent": "envelope_exponent",
+            "num_before_skip": "num_before_skip",
+            "num_after_skip": "num_after_skip",
+            "num_output_layers": "num_output_layers",
+        },
+    ),
+    "GemNet": ModelEntry(
+        module="geom3d.models.GemNet",
+        cls="GemNet",
+        kw_map={
+            "node_class": "node_class",
+            "num_targets": "num_targets",
+            "num_blocks": "num_blocks",
+            "emb_size_atom": "emb_size_atom",
+            "emb_size_edge": "emb_size_edge",
+            "emb_size_trip": "emb_size_trip",
+            "emb_size_quad": "emb_size_quad",
+            "emb_size_rbf": "emb_size_rbf",
+            "emb_size_cbf": "emb_size_cbf",
+            "emb_size_sbf": "emb_size_sbf",
+            "emb_size_bil_quad": "emb_size_bil_quad",
+            "emb_size_bil_trip": "emb_size_bil_trip",
+            "num_concat": "num_concat",
+            "num_atom": "num_atom",
+            "triplets_only": "triplets_only",
+            "direct_forces": "direct_forces",
+            "extensive": "extensive",
+            "forces_coupled": "forces_coupled",
+            "cutoff": "cutoff",
+            "int_cutoff": "int_cutoff",
+            "envelope_exponent": "envelope_exponent",
+            "num_spherical": "num_spherical",
+            "num_radial": "num_radial",
+            "num_before_skip": "num_before_skip",
+            "num_after_skip": "num_after_skip",
+        },
+    ),
+    "SphereNet": ModelEntry(
+        module="geom3d.models.SphereNet",
+        cls="SphereNet",
+        kw_map={
+            "hidden_channels": "hidden_channels",
+            "out_channels": "out_channels",
+            "cutoff": "cutoff",
+            "num_layers": "num_layers",
+            "int_emb_size": "int_emb_size",
+            "basis_emb_size_dist": "basis_emb_size_dist",
+            "basis_emb_size_angle": "basis_emb_size_angle",
+            "basis_emb_size_torsion": "basis_emb_size_torsion",
+            "out_emb_channels": "out_emb_channels",
+            "num_spherical": "num_spherical",
+            "num_radial": "num_radial",
+            "envelope_exponent": "envelope_exponent",
+            "num_before_skip": "num_before_skip",
+            "num_after_skip": "num_after_skip",
+            "num_output_layers": "num_output_layers",
+        },
+        fixed={
+            "energy_and_force": False,
+        },
+    ),
+    "PaiNN": ModelEntry(
+        module="geom3d.models.PaiNN",
+        cls="PaiNN",
+        kw_map={
+            "n_atom_basis": "n_atom_basis",
+            "n_interactions": "n_interactions",
+            "n_rbf": "n_rbf",
+            "cutoff": "cutoff",
+            "max_z": "max_z",
+            "n_out": "n_out",
+            "readout": "readout",
+        },
+    ),
+    "Equiformer": ModelEntry(
+        module="geom3d.models.Equiformer",
+        cls="EquiformerEnergy",
+        kw_map={
+            "irreps_in": "Equiformer_irreps_in",
+            "max_radius": "Equiformer_radius",
+            "node_class": "node_class",
+            "number_of_basis": "Equiformer_num_basis",
+            "irreps_node_embedding": "irreps_node_embedding",
+        },
+        fixed={
+            "num_layers": 6,
+            "irreps_node_attr": "1x0e",
+            "irreps_sh": "1x0e+1x1e+1x2e",
+            "irreps_head": "32x0e+16x1e+8x2e",
+            "irreps_pre_attn": None,
+            "rescale_degree": False,
+            "norm_layer": "layer",
+        },
+        extra=equiformer_preset_kwargs,
+    ),
+}
+
+
+def build_model(config):
+    """
+    Build the model named by config["model_name"] from the registry.
+
+    Args:
+    - config (dict): configuration file
+
+    Returns:
+    - model (nn.Module): model
+    """
+    if config["model_name"] not in MODEL_REGISTRY:
+        raise ValueError("Invalid model name")
+
+    model_config = config["model"]
+    entry = MODEL_REGISTRY[config["model_name"]]
+    kwargs = {k: model_config[v] for k, v in entry.kw_map.items()}
+    if entry.fixed is not None:
+        kwargs.update(entry.fixed)
+    if entry.extra is not None:
+        kwargs.update(entry.extra(model_config))
+
+    model_class = getattr(importlib.import_module(entry.module), entry.cls)
+    return model_class(**kwargs)
@@ -1,3 +1,6 @@
+import hashlib
+import json
+import types
 import stk
 import pymongo
 import numpy as np
@@ -16,6 +19,7 @@ import lightning.pytorch as pl
 import torch.nn.functional as Functional
 import torch.distributed as dist
 from torch.nn.parallel import DistributedDataParallel
+from torch.utils.checkpoint import checkpoint
 from lightning.pytorch.loggers import WandbLogger
 from lightning.pytorch.callbacks import ModelCheckpoint, LearningRateMonitor
 from pathlib import Path
@@ -23,10 +27,36 @@ from pathlib import Path
 from geom3d import dataloader
 from geom3d.dataloader import load_data, train_val_test_split, load_3d_rpr
 from geom3d.dataloaders.dataloaders_GemNet import DataLoaderGemNet
-from geom3d import models
-from geom3d.models import SchNet, DimeNet, DimeNetPlusPlus, GemNet, SphereNet, SphereNetPeriodic, PaiNN, EquiformerEnergy
 from geom3d.utils import database_utils
 from geom3d.utils.config_utils import read_config
+from geom3d.utils.model_registry import build_model
+
+# names of the interaction block lists: SchNet/PaiNN, DimeNet/DimeNet++,
+# GemNet and SphereNet
+INTERACTION_BLOCK_ATTRIBUTES = (
+    "interactions",
+    "interaction_blocks",
+    "int_blocks",
+    "update_es",
+)
+
+
+def _checkpointed_forward(self, *args, **kwargs):
+    return checkpoint(type(self).forward, self, *args, use_reentrant=False, **kwargs)
+
+
+def checkpoint_forward(block):
+    """
+    Replace the forward of a block in place so that its activations are
+    recomputed during the backward pass instead of being stored in the
+    forward pass. The block is not wrapped, so its state dict keys are kept,
+    and the forward is bound to the block, so deep copies checkpoint their
+    own parameters.
+
+    Args:
+    - block (nn.Module): block to checkpoint
+    """
+    block.forward = types.MethodType(_checkpointed_forward, block)
 
 
 def model_setup(config, trial=None):
@@ -47,160 +77,91 @@ def model_setup(config, trial=None):
     if trial:
         config = hyperparameter_setup(config, trial)
 
+    if config["model_name"] == "Equiformer" and config.get("compile_model", False):
+        import e3nn
+        # leave the e3nn codegen in python so TorchInductor can trace it
+        e3nn.set_optimization_defaults(jit_script_fx=False)
+
+    model = build_model(config)
+
+    if config.get("reuse_init_weights"):
+        model = reuse_init_weights(model, config)
+
     if config["model_name"] == "SchNet":
-        model = SchNet(
-            hidden_channels=model_config["emb_dim"],
-            num_filters=model_config["SchNet_num_filters"],
-            num_interactions=model_config["SchNet_num_interactions"],
-            num_gaussians=model_config["SchNet_num_gaussians"],
-            cutoff=model_config["SchNet_cutoff"],
-            readout=model_config["SchNet_readout"],
-            node_class=model_config["node_class"],
-        )
         graph_pred_linear = torch.nn.Linear(
             model_config["emb_dim"], model_config["num_tasks"]
         )
-
-    elif config["model_name"] == "DimeNet":
-        model = DimeNet(
-            node_class=model_config["node_class"],
-            hidden_channels=model_config["hidden_channels"],
-            out_channels=model_config["out_channels"],
-            num_blocks=model_config["num_blocks"],
-            num_bilinear=model_config["num_bilinear"],
-            num_spherical=model_config["num_spherical"],
-            num_radial=model_config["num_radial"],
-            cutoff=model_config["cutoff"],
-            envelope_exponent=model_config["envelope_exponent"],
-            num_before_skip=model_config["num_before_skip"],
-            num_after_skip=model_config["num_after_skip"],
-            num_output_layers=model_config["num_output_layers"],
-        )
+    elif config["model_name"] == "PaiNN":
+        graph_pred_linear = model.create_output_layers()
+    else:
         graph_pred_linear = None
 
-    elif config["model_name"] == "DimeNetPlusPlus":
-        model = DimeNetPlusPlus(
-            node_class=model_config["node_class"],
-            hidden_channels=model_config["hidden_channels"],
-            out_channels=model_config["out_channels"],
-            num_blocks=model_config["num_blocks"],
-            int_emb_size=model_config["int_emb_size"],
-            basis_emb_size=model_config["basis_emb_size"],
-            out_emb_channels=model_config["out_emb_channels"],
-            num_spherical=model_config["num_spherical"],
-            num_radial=model_config["num_radial"],
-            cutoff=model_config["cutoff"],
-            envelope_exponent=model_config["envelope_exponent"],
-            num_before_skip=model_config["num_before_skip"],
-            num_after_skip=model_config["num_after_skip"],
-            num_output_layers=model_config["num_output_layers"],
-        )
-        graph_pred_linear = None
+    if config.get("conv_checkpointing", False):
+        model = apply_conv_checkpointing(model)
 
-    elif config["model_name"] == "GemNet":
-        model = GemNet(
-            node_class=model_config["node_class"],
-            num_targets=model_config["num_targets"],
-            num_blocks=model_config["num_blocks"],
-            emb_size_atom=model_config["emb_size_atom"],
-            emb_size_edge=model_config["emb_size_edge"],
-            emb_size_trip=model_config["emb_size_trip"],
-            emb_size_quad=model_config["emb_size_quad"],
-            emb_size_rbf=model_config["emb_size_rbf"],
-            emb_size_cbf=model_config["emb_size_cbf"],
-            emb_size_sbf=model_config["emb_size_sbf"],
-            emb_size_bil_quad=model_config["emb_size_bil_quad"],
-            emb_size_bil_trip=model_config["emb_size_bil_trip"],
-            num_concat=model_config["num_concat"],
-            num_atom=model_config["num_atom"],
-            triplets_only=model_config["triplets_only"],
-            direct_forces=model_config["direct_forces"],
-            extensive=model_config["extensive"],
-            forces_coupled=model_config["forces_coupled"],
-            cutoff=model_config["cutoff"],
-            int_cutoff=model_config["int_cutoff"],
-            envelope_exponent=model_config["envelope_exponent"],
-            num_spherical=model_config["num_spherical"],
-            num_radial=model_config["num_radial"],
-            num_before_skip=model_config["num_before_skip"],
-            num_after_skip=model_config["num_after_skip"],
-        )
-        graph_pred_linear = None
+    return model, graph_pred_linear
 
-    elif config["model_name"] == "SphereNet":
-        model = SphereNet(
-            energy_and_force=False,
-            hidden_channels=model_config["hidden_channels"],
-            out_channels=model_config["out_channels"],
-            cutoff=model_config["cutoff"],
-            num_layers=model_config["num_layers"],
-            int_emb_size=model_config["int_emb_size"],
-            basis_emb_size_dist=model_config["basis_emb_size_dist"],
-            basis_emb_size_angle=model_config["basis_emb_size_angle"],
-            basis_emb_size_torsion=model_config["basis_emb_size_torsion"],
-            out_emb_channels=model_config["out_emb_channels"],
-            num_spherical=model_config["num_spherical"],
-            num_radial=model_config["num_radial"],
-            envelope_exponent=model_config["envelope_exponent"],
-            num_before_skip=model_config["num_before_skip"],
-            num_after_skip=model_config["num_after_skip"],
-            num_output_layers=model_config["num_output_layers"],
-        )
-        graph_pred_linear = None
 
-    elif config["model_name"] == "PaiNN":
-        model = PaiNN(
-            n_atom_basis=model_config["n_atom_basis"],
-            n_interactions=model_config["n_interactions"],
-            n_rbf=model_config["n_rbf"],
-            cutoff=model_config["cutoff"],
-            max_z=model_config["max_z"],
-            n_out=model_config["n_out"],
-            readout=model_config["readout"],
-        )
-        graph_pred_linear = model.create_output_layers()
+def reuse_init_weights(model, config):
+    """
+    Share the same initial weights across runs with the same architecture,
+    e.g. in a sweep. The weights are stored in the config["reuse_init_weights"]
+    directory, in one file per model name and config["model"], so trials with
+    different hyperparameters do not overwrite each other.
 
-    elif config["model_name"] == "Equiformer":
-        if config["model"]["Equiformer_hyperparameter"] == 0:
-            # This follows the hyper in Equiformer_l2
-            model = EquiformerEnergy(
-                irreps_in=model_config["Equiformer_irreps_in"],
-                max_radius=model_config["Equiformer_radius"],
-                node_class=model_config["node_class"],
-                number_of_basis=model_config["Equiformer_num_basis"], 
-                irreps_node_embedding=model_config["irreps_node_embedding"], 
-                num_layers=6,
-                irreps_node_attr='1x0e', irreps_sh='1x0e+1x1e+1x2e',
-                fc_neurons=[32,32], 
-                irreps_feature='256x0e',
-                irreps_head='32x0e+16x1e+8x2e', num_heads=2, irreps_pre_attn=None,
-                rescale_degree=False, nonlinear_message=False,
-                irreps_mlp_mid='192x0e+96x1e+48x2e',
-                norm_layer='layer',
-                alpha_drop=0.3, proj_drop=0.1, out_drop=0.1, drop_path_rate=0.1)
-        elif config["model"]["Equiformer_hyperparameter"] == 1:
-            # This follows the hyper in Equiformer_nonlinear_bessel_l2_drop00
-            model = EquiformerEnergy(
-                irreps_in=model_config["Equiformer_irreps_in"],
-                max_radius=model_config["Equiformer_radius"],
-                node_class=model_config["node_class"],
-                number_of_basis=model_config["Equiformer_num_basis"], 
-                irreps_node_embedding=model_config["irreps_node_embedding"], 
-                num_layers=6,
-                irreps_node_attr='1x0e', irreps_sh='1x0e+1x1e+1x2e',
-                fc_neurons=[64, 64], basis_type='bessel',
-                irreps_feature='512x0e',
-                irreps_head='32x0e+16x1e+8x2e', num_heads=4, irreps_pre_attn=None,
-                rescale_degree=False, nonlinear_message=True,
-                irreps_mlp_mid='384x0e+192x1e+96x2e',
-                norm_layer='layer',
-                alpha_drop=0.0, proj_drop=0.0, out_drop=0.0, drop_path_rate=0.0)
-        graph_pred_linear = None
-    
+    Args:
+    - model (nn.Module): freshly initialised model
+    - config (dict): configuration file
+
+    Returns:
+    - model (nn.Module): model with the stored initial weights if available
+    """
+    architecture = json.dumps(
+        [config["model_name"], config["model"]], sort_keys=True, default=str
+    )
+    digest = hashlib.sha1(architecture.encode()).hexdigest()[:16]
+    init_weights_path = os.path.join(
+        config["reuse_init_weights"], f"{config['model_name']}_{digest}.pt"
+    )
+
+    if not os.path.exists(init_weights_path):
+        os.makedirs(config["reuse_init_weights"], exist_ok=True)
+        torch.save(model.state_dict(), init_weights_path)
+        print(f"Initial weights saved to {init_weights_path}")
+        return model
+
+    # mmap reads the tensors from the file without an extra host copy
+    state_dict = torch.load(init_weights_path, map_location="cpu", mmap=True)
+    model_state_dict = model.state_dict()
+    shapes_match = state_dict.keys() == model_state_dict.keys() and all(
+        state_dict[key].shape == model_state_dict[key].shape
+        for key in state_dict
+    )
+    if shapes_match:
+        model.load_state_dict(state_dict)
+        print(f"Initial weights loaded from {init_weights_path}")
     else:
-        raise ValueError("Invalid model name")
-    
-    return model, graph_pred_linear
+        print(f"Initial weights in {init_weights_path} do not match the model, not loaded")
+    return model
+
+
+def apply_conv_checkpointing(model):
+    """
+    Checkpoint the forward of each interaction block of the model.
+
+    Args:
+    - model (nn.Module): model
+
+    Returns:
+    - model (nn.Module): model with checkpointed interaction blocks
+    """
+    for attribute in INTERACTION_BLOCK_ATTRIBUTES:
+        blocks = getattr(model, attribute, None)
+        if isinstance(blocks, nn.ModuleList):
+            for block in blocks:
+                checkpoint_forward(block)
+    return model
+
 
 def hyperparameter_setup(config, trial):
     """
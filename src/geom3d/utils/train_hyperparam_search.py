@@ -39,15 +39,12 @@ from pathlib import Path
 from geom3d import dataloader
 from geom3d.dataloader import load_data, train_val_test_split, load_3d_rpr
 from geom3d.dataloaders.dataloaders_GemNet import DataLoaderGemNet
-from geom3d import models
-from geom3d.models import SchNet, DimeNet, DimeNetPlusPlus, GemNet, SphereNet, SphereNetPeriodic, PaiNN, EquiformerEnergy
 from geom3d.utils import database_utils
 from geom3d.utils import model_setup_utils
 from geom3d.utils.config_utils import read_config
 from geom3d.utils.model_setup_utils import model_setup, hyperparameter_setup
 from geom3d.pymodel import Pymodel, PrintLearningRate
 
-importlib.reload(models)
 importlib.reload(dataloader)
 importlib.reload(model_setup_utils)
 
@@ -0,0 +1,285 @@
+"""
+Tests for the model registry used by model_setup.
+
+The expected keyword arguments are the ones the models were built with before
+the registry was introduced. The model classes are replaced by a stub, and the
+model modules are parsed rather than imported, so the tests do not need the
+model dependencies.
+"""
+import ast
+import types
+from pathlib import Path
+
+import pytest
+
+import geom3d
+from geom3d.utils import model_registry
+from geom3d.utils.model_registry import MODEL_REGISTRY, build_model
+
+__author__ = "mohammed azzouzi"
+__copyright__ = "mohammed azzouzi"
+__license__ = "MIT"
+
+
+class ConfigKeys(dict):
+    """config["model"] returning a placeholder naming each key that is read"""
+
+    def __missing__(self, key):
+        return "config:" + key
+
+
+EXPECTED_KWARGS = [
+    (
+        "SchNet",
+        None,
+        {
+            "hidden_channels": "config:emb_dim",
+            "num_filters": "config:SchNet_num_filters",
+            "num_interactions": "config:SchNet_num_interactions",
+            "num_gaussians": "config:SchNet_num_gaussians",
+            "cutoff": "config:SchNet_cutoff",
+            "readout": "config:SchNet_readout",
+            "node_class": "config:node_class",
+        },
+    ),
+    (
+        "DimeNet",
+        None,
+        {
+            "node_class": "config:node_class",
+            "hidden_channels": "config:hidden_channels",
+            "out_channels": "config:out_channels",
+            "num_blocks": "config:num_blocks",
+            "num_bilinear": "config:num_bilinear",
+            "num_spherical": "config:num_spherical",
+            "num_radial": "config:num_radial",
+            "cutoff": "config:cutoff",
+            "envelope_exponent": "config:envelope_exponent",
+            "num_before_skip": "config:num_before_skip",
+            "num_after_skip": "config:num_after_skip",
+            "num_output_layers": "config:num_output_layers",
+        },
+    ),
+    (
+        "DimeNetPlusPlus",
+        None,
+        {
+            "node_class": "config:node_class",
+            "hidden_channels": "config:hidden_channels",
+            "out_channels": "config:out_channels",
+            "num_blocks": "config:num_blocks",
+            "int_emb_size": "config:int_emb_size",
+            "basis_emb_size": "config:basis_emb_size",
+            "out_emb_channels": "config:out_emb_channels",
+            "num_spherical": "config:num_spherical",
+            "num_radial": "config:num_radial",
+            "cutoff": "config:cutoff",
+            "envelope_exponent": "config:envelope_exponent",
+            "num_before_skip": "config:num_before_skip",
+            "num_after_skip": "config:num_after_skip",
+            "num_output_layers": "config:num_output_layers",
+        },
+    ),
+    (
+        "GemNet",
+        None,
+        {
+            "node_class": "config:node_class",
+            "num_targets": "config:num_targets",
+            "num_blocks": "config:num_blocks",
+            "emb_size_atom": "config:emb_size_atom",
+            "emb_size_edge": "config:emb_size_edge",
+            "emb_size_trip": "config:emb_size_trip",
+            "emb_size_quad": "config:emb_size_quad",
+            "emb_size_rbf": "config:emb_size_rbf",
+            "emb_size_cbf": "config:emb_size_cbf",
+            "emb_size_sbf": "config:emb_size_sbf",
+            "emb_size_bil_quad": "config:emb_size_bil_quad",
+            "emb_size_bil_trip": "config:emb_size_bil_trip",
+            "num_concat": "config:num_concat",
+            "num_atom": "config:num_atom",
+            "triplets_only": "config:triplets_only",
+            "direct_forces": "config:direct_forces",
+            "extensive": "config:extensive",
+            "forces_coupled": "config:forces_coupled",
+            "cutoff": "config:cutoff",
+            "int_cutoff": "config:int_cutoff",
+            "envelope_exponent": "config:envelope_exponent",
+            "num_spherical": "config:num_spherical",
+            "num_radial": "config:num_radial",
+            "num_before_skip": "config:num_before_skip",
+            "num_after_skip": "config:num_after_skip",
+        },
+    ),
+    (
+        "SphereNet",
+        None,
+        {
+            "energy_and_force": False,
+            "hidden_channels": "config:hidden_channels",
+            "out_channels": "config:out_channels",
+            "cutoff": "config:cutoff",
+            "num_layers": "config:num_layers",
+            "int_emb_size": "config:int_emb_size",
+            "basis_emb_size_dist": "config:basis_emb_size_dist",
+            "basis_emb_size_angle": "config:basis_emb_size_angle",
+            "basis_emb_size_torsion": "config:basis_emb_size_torsion",
+            "out_emb_channels": "config:out_emb_channels",
+            "num_spherical": "config:num_spherical",
+            "num_radial": "config:num_radial",
+            "envelope_exponent": "config:envelope_exponent",
+            "num_before_skip": "config:num_before_skip",
+            "num_after_skip": "config:num_after_skip",
+            "num_output_layers": "config:num_output_layers",
+        },
+    ),
+    (
+        "PaiNN",
+        None,
+        {
+            "n_atom_basis": "config:n_atom_basis",
+            "n_interactions": "config:n_interactions",
+            "n_rbf": "config:n_rbf",
+            "cutoff": "config:cutoff",
+            "max_z": "config:max_z",
+            "n_out": "config:n_out",
+            "readout": "config:readout",
+        },
+    ),
+    (
+        "Equiformer",
+        0,
+        {
+            "irreps_in": "config:Equiformer_irreps_in",
+            "max_radius": "config:Equiformer_radius",
+            "node_class": "config:node_class",
+            "number_of_basis": "config:Equiformer_num_basis",
+            "irreps_node_embedding": "config:irreps_node_embedding",
+            "num_layers": 6,
+            "irreps_node_attr": "1x0e",
+            "irreps_sh": "1x0e+1x1e+1x2e",
+            "fc_neurons": [32, 32],
+            "irreps_feature": "256x0e",
+            "irreps_head": "32x0e+16x1e+8x2e",
+            "num_heads": 2,
+            "irreps_pre_attn": None,
+            "rescale_degree": False,
+            "nonlinear_message": False,
+            "irreps_mlp_mid": "192x0e+96x1e+48x2e",
+            "norm_layer": "layer",
+            "alpha_drop": 0.3,
+            "proj_drop": 0.1,
+            "out_drop": 0.1,
+            "drop_path_rate": 0.1,
+        },
+    ),
+    (
+        "Equiformer",
+        1,
+        {
+            "irreps_in": "config:Equiformer_irreps_in",
+            "max_radius": "config:Equiformer_radius",
+            "node_class": "config:node_class",
+            "number_of_basis": "config:Equiformer_num_basis",
+            "irreps_node_embedding": "config:irreps_node_embedding",
+            "num_layers": 6,
+            "irreps_node_attr": "1x0e",
+            "irreps_sh": "1x0e+1x1e+1x2e",
+            "fc_neurons": [64, 64],
+            "basis_type": "bessel",
+            "irreps_feature": "512x0e",
+            "irreps_head": "32x0e+16x1e+8x2e",
+            "num_heads": 4,
+            "irreps_pre_attn": None,
+            "rescale_degree": False,
+            "nonlinear_message": True,
+            "irreps_mlp_mid": "384x0e+192x1e+96x2e",
+            "norm_layer": "layer",
+            "alpha_drop": 0.0,
+            "proj_drop": 0.0,
+            "out_drop": 0.0,
+            "drop_path_rate": 0.0,
+        },
+    ),
+]
+
+
+@pytest.fixture
+def built_kwargs(monkeypatch):
+    """Replace the model classes by a stub returning its keyword arguments"""
+
+    def import_module(module_name):
+        class_names = [
+            entry.cls
+            for entry in MODEL_REGISTRY.values()
+            if entry.module == module_name
+        ]
+        return types.SimpleNamespace(
+            **{class_name: lambda **kwargs: kwargs for class_name in class_names}
+        )
+
+    monkeypatch.setattr(
+        model_registry,
+        "importlib",
+        types.SimpleNamespace(import_module=import_module),
+    )
+
+
+@pytest.mark.parametrize("model_name, preset, expected", EXPECTED_KWARGS)
+def test_build_model_kwargs(built_kwargs, model_name, preset, expected):
+    model_config = ConfigKeys()
+    if preset is not None:
+        model_config["Equiformer_hyperparameter"] = preset
+    config = {"model_name": model_name, "model": model_config}
+    assert build_model(config) == expected
+
+
+def module_path(module_name):
+    """Source file of a geom3d module, without importing it"""
+    path = Path(geom3d.__file__).parent.joinpath(*module_name.split(".")[1:])
+    if path.is_dir():
+        return path / "__init__.py"
+    return path.with_suffix(".py")
+
+
+def defines_class(module_name, class_name):
+    """Whether the module defines the class, or imports it from a module that does"""
+    tree = ast.parse(module_path(module_name).read_text())
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef) and node.name == class_name:
+            return True
+        if isinstance(node, ast.ImportFrom) and any(
+            (alias.asname or alias.name) == class_name for alias in node.names
+        ):
+            if node.level == 0:
+                source = node.module
+            else:
+                package = module_name.split(".")
+                if module_path(module_name).name != "__init__.py":
+                    package = package[:-1]
+                package = package[: len(package) - node.level + 1]
+                source = ".".join(package + ([node.module] if node.module else []))
+            return defines_class(source, class_name)
+    return False
+
+
+@pytest.mark.parametrize("model_name", list(MODEL_REGISTRY))
+def test_model_class_exists(model_name):
+    entry = MODEL_REGISTRY[model_name]
+    assert module_path(entry.module).is_file()
+    assert defines_class(entry.module, entry.cls)
+
+
+def test_every_model_is_tested():
+    assert {name for name, _, _ in EXPECTED_KWARGS} == set(MODEL_REGISTRY)
+
+
+def test_invalid_model_name():
+    with pytest.raises(ValueError):
+        build_model({"model_name": "NotAModel", "model": {}})
+
+
+def test_invalid_equiformer_preset(built_kwargs):
+    model_config = ConfigKeys(Equiformer_hyperparameter=2)
+    with pytest.raises(ValueError):
+        build_model({"model_name": "Equiformer", "model": model_config})